@@ -1,16 +1,28 @@
 from __future__ import annotations
-from datetime import datetime
+import atexit
+from functools import lru_cache
+from itertools import chain
+import json
 import os
+import queue
 import sqlite3
+import stat
+import threading
+import zlib
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Optional
+from typing import Final, Optional
 from urllib.parse import quote  # para montar ?next= no login_required
 
 from flask import (
-    Flask, g, redirect, render_template_string, request, session, url_for, flash
+    Flask, g, redirect, render_template, request, session, url_for, flash,
+    get_flashed_messages, stream_template
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from jinja2 import DictLoader
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from jinja2 import DictLoader, FileSystemBytecodeCache
+from markupsafe import Markup
 
 # -----------------------------------------------------
 # Config
@@ -18,12 +30,20 @@ from jinja2 import DictLoader
 app = Flask(__name__)
 app.config.update(
     SECRET_KEY=os.environ.get("SECRET_KEY", "dev-secret-change-me"),
-    DATABASE=str(Path(__file__).with_name("helpdesk.db")),
+    DATABASE=os.environ.get("DATABASE") or str(Path(__file__).with_name("helpdesk.db")),
+    DB_POOL_SIZE=int(os.environ.get("DB_POOL_SIZE", "8")),
+    TEMPLATES_AUTO_RELOAD=False,
+    EXPLAIN_TEMPLATE_LOADING=False,
+    # Vazio = diretório temporário do usuário (FileSystemBytecodeCache padrão)
+    JINJA_CACHE_DIR=os.environ.get("JINJA_CACHE_DIR") or None,
+    # Assets em static/vendor/<lib>-<versão>/: o caminho muda junto com a versão
+    SEND_FILE_MAX_AGE_DEFAULT=31536000,
 )
 
 # -----------------------------------------------------
 # DB
 # -----------------------------------------------------
+# created_at: ISO-8601 UTC sem fuso, gerado pelo próprio SQLite (compatível com as linhas antigas)
 SCHEMA_SQL = r"""
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,7 +51,7 @@ CREATE TABLE IF NOT EXISTS users (
     email TEXT NOT NULL UNIQUE,
     password_hash TEXT NOT NULL,
     role TEXT NOT NULL DEFAULT 'cliente',
-    created_at TEXT NOT NULL
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
 );
 
 CREATE TABLE IF NOT EXISTS tickets (
@@ -42,7 +62,7 @@ CREATE TABLE IF NOT EXISTS tickets (
     department TEXT,
     subcategory TEXT,
     user_id INTEGER NOT NULL,
-    created_at TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
     FOREIGN KEY(user_id) REFERENCES users(id)
 );
 
@@ -51,10 +71,32 @@ CREATE TABLE IF NOT EXISTS comments (
     ticket_id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
     body TEXT NOT NULL,
-    created_at TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
     FOREIGN KEY(ticket_id) REFERENCES tickets(id),
     FOREIGN KEY(user_id) REFERENCES users(id)
 );
+
+-- users.email já é indexado pelo UNIQUE
+CREATE INDEX IF NOT EXISTS idx_tickets_user_status ON tickets(user_id, status);
+-- índice termina no rowid (= id): "WHERE user_id = ? ORDER BY id DESC" sem sort temporário
+CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets(user_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status);
+CREATE INDEX IF NOT EXISTS idx_comments_ticket ON comments(ticket_id);
+
+-- Versão das listagens (ETag): toda escrita em tickets, ou no nome/e-mail de um autor, incrementa
+CREATE TABLE IF NOT EXISTS list_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    n INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO list_version (id, n) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS trg_tickets_insert_version AFTER INSERT ON tickets
+BEGIN UPDATE list_version SET n = n + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_tickets_update_version AFTER UPDATE ON tickets
+BEGIN UPDATE list_version SET n = n + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_tickets_delete_version AFTER DELETE ON tickets
+BEGIN UPDATE list_version SET n = n + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS trg_users_author_version AFTER UPDATE OF name, email ON users
+BEGIN UPDATE list_version SET n = n + 1 WHERE id = 1; END;
 """
 
 DEPT_MAP = {
@@ -63,18 +105,253 @@ DEPT_MAP = {
     "Sistemas": ["ERP", "CRM", "BI/Relatórios", "Integrações"],
     "Financeiro": ["NF/Boletos", "Pagamentos", "Cadastro Fornecedor"],
 }
+DEPT_KEYS: Final[tuple[str, ...]] = tuple(DEPT_MAP)
+
+# Conexões reaproveitadas entre requests (LIFO mantém a mais "quente" no topo)
+_POOL: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=app.config["DB_POOL_SIZE"])
+
+def _connect() -> sqlite3.Connection:
+    db = sqlite3.connect(app.config["DATABASE"], check_same_thread=False, cached_statements=256)
+    db.row_factory = sqlite3.Row
+    db.executescript(
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA foreign_keys=ON;"
+        "PRAGMA mmap_size=134217728;"
+        "PRAGMA cache_size=-20000;"
+        "PRAGMA temp_store=MEMORY;"
+    )
+    return db
+
+# (nome, email, senha, papel)
+SEED_USERS = (
+    ("Administrador", "admin@local", "admin123", "admin"),
+)
+
+STATUS_BADGE = {
+    "aberto": "bg-secondary",
+    "em andamento": "bg-warning text-dark",
+    "fechado": "bg-success",
+}
+VALID_STATUSES: Final[frozenset[str]] = frozenset(STATUS_BADGE)
+
+def decorate_ticket(t: dict) -> dict:
+    # Classe do badge resolvida em Python, não por linha no Jinja
+    # (created_short já vem pronto do SELECT, formatado pelo SQLite)
+    t["badge"] = STATUS_BADGE.get(t["status"], "bg-secondary")
+    return t
 
 def get_db():
     if "db" not in g:
-        g.db = sqlite3.connect(app.config["DATABASE"])
-        g.db.row_factory = sqlite3.Row
+        try:
+            g.db = _POOL.get_nowait()
+        except queue.Empty:
+            g.db = _connect()
     return g.db
 
 @app.teardown_appcontext
 def close_db(exc):
     db = g.pop("db", None)
     if db is not None:
-        db.close()
+        db.rollback()
+        try:
+            _POOL.put_nowait(db)
+        except queue.Full:
+            db.close()
+
+def iter_tickets(sql: str, args: tuple = ()):
+    """Chamados decorados lidos do cursor sob demanda, para stream_template.
+
+    Tuplas puras viram dicts uma vez (sem sqlite3.Row por acesso no Jinja).
+
+    Sem linhas devolve [] (o ``{% if tickets %}`` do template continua valendo).
+    A conexão fica no ``g`` até o fim do stream: o teardown só roda depois.
+    """
+    cur = get_db().cursor()
+    cur.row_factory = None
+    cur.execute(sql, args)
+    first = cur.fetchone()
+    if first is None:
+        return []
+    keys = [d[0] for d in cur.description]
+    return (decorate_ticket(dict(zip(keys, r))) for r in chain((first,), cur))
+
+PAGE_SIZE = 50
+PAGE_SIZE_MAX = 200
+_MAX_ROWID = 2**63 - 1  # "id < ?" sem ?before= pega tudo
+
+def page_args() -> tuple[int, int]:
+    """(before, n) de ``?before=<id>&n=`` para a paginação por keyset das listagens."""
+    # Limitado como o n: fora do INTEGER de 64 bits o sqlite3 levanta OverflowError.
+    # Só a ausência do cursor vale "desde o topo"; ?before=0 (ou negativo) é página vazia
+    raw = request.args.get("before", type=int)
+    before = _MAX_ROWID if raw is None else min(max(raw, 0), _MAX_ROWID)
+    n = min(max(request.args.get("n", PAGE_SIZE, type=int), 1), PAGE_SIZE_MAX)
+    return before, n
+
+def list_etag() -> Optional[str]:
+    """ETag fraco das listagens: versão dos dados + usuário + query string + templates.
+
+    None com flash pendente (a mensagem sai uma vez só, então a página não é reaproveitável).
+    Lido antes das linhas: uma escrita no meio deixa a ETag velha, nunca a página.
+    """
+    if "_flashes" in session:
+        return None
+    n = get_db().execute(SQL_LIST_VERSION).fetchone()[0]
+    return f"{n}-{session['user_id']}-{zlib.crc32(request.query_string):x}-{_LIST_ETAG_SALT}"
+
+def list_response(etag: Optional[str], template_name: str, **context):
+    """Listagem em streaming, com ETag para a próxima revalidação do navegador."""
+    get_flashed_messages()  # consumidos antes do stream: a sessão é gravada junto com os headers
+    resp = app.response_class(stream_template(template_name, **context))
+    if etag:
+        resp.set_etag(etag, weak=True)
+    # Página por usuário: só o navegador guarda, e sempre revalida
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+def list_not_modified(etag: str):
+    resp = app.response_class(status=304)
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+def required(form, *keys: str) -> Optional[tuple[str, ...]]:
+    """Campos obrigatórios do formulário, já com strip; None se algum veio vazio."""
+    vals = tuple((form.get(k) or "").strip() for k in keys)
+    return vals if all(vals) else None
+
+class WriteBatcher:
+    """Grava INSERT/UPDATE curtos por uma thread única, vários por transação.
+
+    Cada request espera o próprio Future; sob carga, tudo que chegou enquanto
+    o commit anterior fazia fsync entra no mesmo lote (group commit).
+    """
+
+    def __init__(self, max_items: int = 64, timeout: float = 30.0):
+        self.max_items = max_items
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # None na fila = pedido de encerramento (close)
+        self._queue: "queue.Queue[Optional[tuple[str, tuple, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def submit(self, sql: str, params: tuple = ()) -> Future:
+        self._ensure_thread()
+        fut: Future = Future()
+        self._queue.put((sql, params, fut))
+        return fut
+
+    def execute(self, sql: str, params: tuple = ()) -> int:
+        """Grava e espera o commit; devolve o rowcount do statement.
+
+        Espera no máximo ``timeout`` segundos (TimeoutError), nunca para sempre.
+        """
+        return self.submit(sql, params).result(timeout=self.timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Grava o que já está na fila, fecha a conexão da thread e encerra a thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or self._pid != os.getpid() or not thread.is_alive():
+                return
+            self._thread = None
+            self._queue.put(None)
+        thread.join(timeout)
+
+    def _ensure_thread(self):
+        # Sob demanda e por processo: workers do gunicorn não herdam a thread do master
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        db: Optional[sqlite3.Connection] = None
+        stop = False
+        while not stop:
+            batch = []
+            while len(batch) < self.max_items:
+                try:
+                    item = self._queue.get_nowait() if batch else self._queue.get()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if not batch:
+                continue
+            # O loop só termina via close(): a thread segura o lock de escrita enquanto há transação
+            try:
+                if db is None:
+                    db = _connect()
+                self._flush(db, batch)
+            except Exception as exc:
+                db = self._abort(db)
+                for _, _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+        if db is not None:
+            db.close()
+
+    @staticmethod
+    def _abort(db: Optional[sqlite3.Connection]) -> Optional[sqlite3.Connection]:
+        # Lote falhou: desfaz a transação; se nem o rollback der certo, descarta a conexão
+        if db is None:
+            return None
+        try:
+            if db.in_transaction:
+                db.rollback()
+            return db
+        except Exception:
+            try:
+                db.close()
+            except Exception:
+                pass
+            return None
+
+    def _flush(self, db: sqlite3.Connection, batch: list):
+        results = []
+        db.execute("BEGIN IMMEDIATE")
+        for sql, params, fut in batch:
+            try:
+                results.append((fut, db.execute(sql, params).rowcount, None))
+            except Exception as exc:
+                # Erro do próprio statement (constraint, parâmetro fora do INTEGER do SQLite)
+                # falha só ele; se a transação caiu junto, o lote inteiro falha em _run
+                if not db.in_transaction:
+                    raise
+                results.append((fut, None, exc))
+        db.commit()
+        for fut, rowcount, exc in results:
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(rowcount)
+
+writer = WriteBatcher()
+
+def close_db_pool():
+    while True:
+        try:
+            _POOL.get_nowait().close()
+        except queue.Empty:
+            return
+
+def close_db_connections():
+    # Escritor primeiro, pool depois: a última conexão a fechar faz o checkpoint final do WAL
+    writer.close()
+    close_db_pool()
+
+# Conexões vivem o processo inteiro; fecha todas na saída
+atexit.register(close_db_connections)
 
 def _column_exists(table: str, name: str) -> bool:
     db = get_db()
@@ -83,39 +360,91 @@ def _column_exists(table: str, name: str) -> bool:
 
 def init_db():
     db = get_db()
-    db.executescript(SCHEMA_SQL)
-    db.commit()
+    # Script inteiro numa transação só (sem isso cada CREATE faz seu próprio commit)
+    db.executescript("BEGIN;" + SCHEMA_SQL + "COMMIT;")
+
+    # Migrações leves (para quem veio de versões antigas) + seed: um único commit
+    with db:
+        db.execute("BEGIN")
+        if not _column_exists("users", "role"):
+            db.execute("ALTER TABLE users ADD COLUMN role TEXT NOT NULL DEFAULT 'cliente'")
+        if not _column_exists("tickets", "department"):
+            db.execute("ALTER TABLE tickets ADD COLUMN department TEXT")
+        if not _column_exists("tickets", "subcategory"):
+            db.execute("ALTER TABLE tickets ADD COLUMN subcategory TEXT")
+
+        # Usuários semente: uma consulta para achar os que faltam e um executemany para inseri-los
+        emails = [u[1] for u in SEED_USERS]
+        cur = db.execute(f"SELECT email FROM users WHERE email IN ({','.join('?' * len(emails))})", emails)
+        existing = {row[0] for row in cur}
+        db.executemany(
+            "INSERT INTO users (name, email, password_hash, role, created_at) VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))",
+            [(name, email, hash_password(pwd), role) for name, email, pwd, role in SEED_USERS if email not in existing],
+        )
 
-    # Migrações leves (para quem veio de versões antigas)
-    if not _column_exists("users", "role"):
-        db.execute("ALTER TABLE users ADD COLUMN role TEXT NOT NULL DEFAULT 'cliente'")
-        db.commit()
-    if not _column_exists("tickets", "department"):
-        db.execute("ALTER TABLE tickets ADD COLUMN department TEXT")
-        db.commit()
-    if not _column_exists("tickets", "subcategory"):
-        db.execute("ALTER TABLE tickets ADD COLUMN subcategory TEXT")
-        db.commit()
+_DB_READY = False
 
-    # Usuário admin semente
-    cur = db.execute("SELECT 1 FROM users WHERE email = ?", ("admin@local",))
-    if cur.fetchone() is None:
-        db.execute(
-            "INSERT INTO users (name, email, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)",
-            ("Administrador", "admin@local", generate_password_hash("admin123"), "admin", datetime.utcnow().isoformat()),
-        )
-        db.commit()
+def _initialize_database():
+    # Schema/migrações/seed rodam uma vez por processo, não a cada request
+    global _DB_READY
+    if _DB_READY:
+        return
+    with app.app_context():
+        init_db()
+    # Com gunicorn --preload o import roda no master: nenhuma conexão pode atravessar o fork
+    close_db_pool()
+    _DB_READY = True
 
 # -----------------------------------------------------
 # Auth helpers
 # -----------------------------------------------------
+# Argon2id nos parâmetros mínimos da OWASP (46 MiB, 1 iteração, 1 thread)
+_PH = PasswordHasher(time_cost=1, memory_cost=46 * 1024, parallelism=1)
+# TESTING: menor custo que o argon2 aceita, para fixtures não pagarem 46 MiB por usuário
+_PH_TESTING = PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
+# Alvo do verify quando não há usuário: mesmo custo, então o tempo não revela e-mails cadastrados
+_DUMMY_HASH = _PH.hash("dummy-password")
+_DUMMY_HASH_TESTING = _PH_TESTING.hash("dummy-password")
+
+# Escolhidos a cada chamada: os testes costumam ligar TESTING depois do import
+def _hasher() -> PasswordHasher:
+    return _PH_TESTING if app.config["TESTING"] else _PH
+
+def dummy_hash() -> str:
+    return _DUMMY_HASH_TESTING if app.config["TESTING"] else _DUMMY_HASH
+
+def hash_password(password: str) -> str:
+    return _hasher().hash(password)
+
+def verify_password(stored: str, password: str) -> bool:
+    # Hashes antigos do werkzeug (pbkdf2/scrypt) seguem válidos até o próximo login
+    if not stored.startswith("$argon2"):
+        return check_password_hash(stored, password)
+    try:
+        return _hasher().verify(stored, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(stored: str) -> bool:
+    # Com TESTING nunca regrava: o hasher barato não pode substituir um hash de produção
+    if app.config["TESTING"]:
+        return False
+    return not stored.startswith("$argon2") or _PH.check_needs_rehash(stored)
+
+_MISS = object()
+
 def current_user() -> Optional[sqlite3.Row]:
-    uid = session.get("user_id")
-    if not uid:
-        return None
-    db = get_db()
-    cur = db.execute("SELECT id, name, email, role, created_at FROM users WHERE id = ?", (uid,))
-    return cur.fetchone()
+    # Cacheado em g: decorators, rota e template pedem o usuário no mesmo request
+    user = g.get("_user", _MISS)
+    if user is _MISS:
+        uid = session.get("user_id")
+        user = None
+        if uid:
+            db = get_db()
+            cur = db.execute(SQL_USER_BY_ID, (uid,))
+            user = cur.fetchone()
+        g._user = user
+    return user
 
 def login_required(fn):
     from functools import wraps
@@ -128,14 +457,25 @@ def login_required(fn):
         return fn(*args, **kwargs)
     return wrapper
 
+def session_role() -> Optional[str]:
+    # Papel gravado na sessão no login; sessões anteriores a isso caem no SELECT uma vez
+    if not session.get("user_id"):
+        return None
+    role = session.get("user_role")
+    if role is None:
+        user = current_user()
+        if user is None:
+            return None
+        role = session["user_role"] = user["role"]
+    return role
+
 def admin_required(fn):
     from functools import wraps
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user = current_user()
-        if not user or user["role"] != "admin":
+        if session_role() != "admin":
             flash("Acesso restrito ao admin.", "danger")
-            return redirect(url_for("index"))
+            return redirect(url_for("app_home"))
         return fn(*args, **kwargs)
     return wrapper
 
@@ -149,8 +489,8 @@ BASE_HTML = r"""
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1">
     <title>{{ title or 'Help Desk' }}</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css" rel="stylesheet">
+    <link href="{{ url_for('static', filename='vendor/bootstrap-5.3.3/css/bootstrap.min.css') }}" rel="stylesheet">
+    <link href="{{ url_for('static', filename='vendor/bootstrap-icons-1.11.3/bootstrap-icons.min.css') }}" rel="stylesheet">
     <style>
       :root {
         --bg: #f8fafc;
@@ -218,6 +558,7 @@ BASE_HTML = r"""
     </style>
   </head>
   <body>
+    {% set menu_html = render_menu(user) %}
     <!-- Topbar (mobile) -->
     <nav class="topbar navbar navbar-light px-2">
       <div class="container-fluid">
@@ -242,7 +583,7 @@ BASE_HTML = r"""
         <button type="button" class="btn-close" data-bs-dismiss="offcanvas"></button>
       </div>
       <div class="offcanvas-body">
-        {% include 'menu.html' %}
+        {{ menu_html }}
       </div>
     </div>
 
@@ -254,7 +595,7 @@ BASE_HTML = r"""
 
           <span class="badge bg-info text-dark">V3.2</span>
         </div>
-        {% include 'menu.html' %}
+        {{ menu_html }}
       </aside>
 
       <!-- Conteúdo -->
@@ -275,7 +616,7 @@ BASE_HTML = r"""
       </main>
     </div>
 
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js"></script>
+    <script src="{{ url_for('static', filename='vendor/bootstrap-5.3.3/js/bootstrap.bundle.min.js') }}"></script>
   </body>
 </html>
 """
@@ -553,25 +894,29 @@ TICKETS_HTML = r"""
 </div>
 
 {% if tickets %}
+  {% set page = namespace(last=none, more=false) %}
   <div class="row g-3">
   {% for t in tickets %}
+    {% if loop.index > page_size %}{% set page.more = true %}{% else %}{% set page.last = t.id %}
     <div class="col-12">
       <div class="card p-3 d-flex flex-md-row align-items-md-center justify-content-between">
         <div>
           <div class="d-flex align-items-center gap-2">
             <a class="h5 mb-1" href="{{ url_for('ticket_view', ticket_id=t.id) }}">#{{ t.id }} — {{ t.title }}</a>
-            <span class="badge {{ 'bg-success' if t.status=='fechado' else ('bg-warning text-dark' if t.status=='em andamento' else 'bg-secondary') }}">{{ t.status|capitalize }}</span>
+            <span class="badge {{ t.badge }}">{{ t.status|capitalize }}</span>
           </div>
           <div class="text-muted small">{{ t.department }}{% if t.subcategory %} · {{ t.subcategory }}{% endif %}</div>
-          <div class="text-muted small">Aberto em {{ t.created_at[:19].replace('T',' ') }}</div>
+          <div class="text-muted small">Aberto em {{ t.created_short }}</div>
         </div>
         <div>
           <a class="btn btn-outline-secondary btn-sm" href="{{ url_for('ticket_view', ticket_id=t.id) }}">Detalhes</a>
         </div>
       </div>
     </div>
+    {% endif %}
   {% endfor %}
   </div>
+  {% include 'pager.html' %}
 {% else %}
   <div class="card p-4"><em>Você ainda não abriu chamados.</em></div>
 {% endif %}
@@ -652,9 +997,9 @@ TICKET_VIEW_HTML = r"""
         <div>
           <h1 class="h5 mb-1">#{{ t.id }} — {{ t.title }}</h1>
           <div class="text-muted small">{{ t.department }}{% if t.subcategory %} · {{ t.subcategory }}{% endif %}</div>
-          <div class="text-muted small">Aberto em {{ t.created_at[:19].replace('T',' ') }}</div>
+          <div class="text-muted small">Aberto em {{ t.created_short }}</div>
         </div>
-        <span class="badge {{ 'bg-success' if t.status=='fechado' else ('bg-warning text-dark' if t.status=='em andamento' else 'bg-secondary') }}">{{ t.status|capitalize }}</span>
+        <span class="badge {{ t.badge }}">{{ t.status|capitalize }}</span>
       </div>
       <hr>
       <p class="mb-4" style="white-space: pre-wrap">{{ t.description }}</p>
@@ -673,11 +1018,12 @@ TICKET_VIEW_HTML = r"""
         {% if comments %}
           <ul class="list-unstyled mb-0">
             {% for c in comments %}
+            {% set a = authors[c.user_id] %}
             <li class="mb-3">
               <div class="p-3 rounded" style="background:#f1f5f9;">
                 <div class="small text-muted d-flex justify-content-between">
-                  <span>{{ c.name }}{% if c.role=='admin' %} (admin){% endif %}</span>
-                  <span>{{ c.created_at[:19].replace('T',' ') }}</span>
+                  <span>{{ a.name }}{% if a.role=='admin' %} (admin){% endif %}</span>
+                  <span>{{ c.created_short }}</span>
                 </div>
                 <div style="white-space: pre-wrap;" class="mt-1">{{ c.body }}</div>
               </div>
@@ -709,6 +1055,7 @@ ADMIN_TICKETS_HTML = r"""
     <h1 class="h4">Painel admin — Todos os chamados</h1>
   </div>
   {% if tickets %}
+  {% set page = namespace(last=none, more=false) %}
   <div class="table-responsive card p-2">
     <table class="table align-middle mb-0">
       <thead>
@@ -718,6 +1065,7 @@ ADMIN_TICKETS_HTML = r"""
       </thead>
       <tbody>
         {% for t in tickets %}
+        {% if loop.index > page_size %}{% set page.more = true %}{% else %}{% set page.last = t.id %}
         <tr>
           <td>#{{ t.id }}</td>
           <td><a href="{{ url_for('ticket_view', ticket_id=t.id) }}">{{ t.title }}</a></td>
@@ -725,9 +1073,9 @@ ADMIN_TICKETS_HTML = r"""
           <td>{{ t.department }}</td>
           <td>{{ t.subcategory }}</td>
           <td>
-            <span class="badge {{ 'bg-success' if t.status=='fechado' else ('bg-warning text-dark' if t.status=='em andamento' else 'bg-secondary') }}">{{ t.status|capitalize }}</span>
+            <span class="badge {{ t.badge }}">{{ t.status|capitalize }}</span>
           </td>
-          <td class="text-muted small">{{ t.created_at[:19].replace('T',' ') }}</td>
+          <td class="text-muted small">{{ t.created_short }}</td>
           <td>
             <form method="post" action="{{ url_for('ticket_update_status', ticket_id=t.id) }}" class="d-flex gap-2">
               <select class="form-select form-select-sm" name="status">
@@ -739,16 +1087,28 @@ ADMIN_TICKETS_HTML = r"""
             </form>
           </td>
         </tr>
+        {% endif %}
         {% endfor %}
       </tbody>
     </table>
   </div>
+  {% include 'pager.html' %}
   {% else %}
     <div class="card p-4">Nenhum chamado encontrado.</div>
   {% endif %}
 {% endblock %}
 """
 
+# Próxima página das listagens (espera o namespace ``page`` preenchido pelo loop)
+PAGER_HTML = r"""
+{% if page.more %}
+  <div class="mt-3 text-end">
+    <a class="btn btn-outline-secondary btn-sm"
+       href="{{ url_for(request.endpoint, status=request.args.get('status'), before=page.last, n=request.args.get('n')) }}">Mais antigos →</a>
+  </div>
+{% endif %}
+"""
+
 # Registrar templates
 from jinja2 import DictLoader
 app.jinja_loader = DictLoader({
@@ -763,19 +1123,136 @@ app.jinja_loader = DictLoader({
     'ticket_new.html': TICKET_NEW_HTML,
     'ticket_view.html': TICKET_VIEW_HTML,
     'admin_tickets.html': ADMIN_TICKETS_HTML,
+    'pager.html': PAGER_HTML,
    })
+# Entra na ETag das listagens: a página depende de templates, badges, SQL e PAGE_SIZE, tudo
+# neste arquivo; deploy que muda o app.py muda a ETag (igual em todos os workers)
+_LIST_ETAG_SALT: Final[str] = format(zlib.crc32(Path(__file__).read_bytes()), "x")
+# O menu só depende do papel, do primeiro nome e do endpoint ativo: renderiza uma vez por combinação
+@lru_cache(maxsize=64)
+def _menu_html(role: Optional[str], first_name: Optional[str], endpoint: Optional[str], script_root: str) -> Markup:
+    user = None if role is None else {"role": role, "name": first_name}
+    return Markup(app.jinja_env.get_template("menu.html").render(user=user, request=request))
+
+@app.template_global()
+def render_menu(user) -> Markup:
+    if user is None:
+        return _menu_html(None, None, request.endpoint, request.script_root)
+    return _menu_html(user["role"], user["name"].split(" ")[0], request.endpoint, request.script_root)
+
+# Templates vivem em memória: sem checagem de "uptodate" e cache sem limite (são poucos)
+app.jinja_env.auto_reload = False
+app.jinja_env.cache = {}
+
+def _private_cache_dir(path: str) -> str:
+    # Mesma garantia do diretório padrão do Jinja: ninguém além do dono consegue plantar bytecode
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise RuntimeError(
+            f"JINJA_CACHE_DIR={path!r} precisa ser um diretório do usuário atual, "
+            "sem escrita para grupo/outros"
+        )
+    return path
+
+# Bytecode compilado em disco: workers novos não refazem lex/parse dos templates
+if app.config["JINJA_CACHE_DIR"]:
+    app.config["JINJA_CACHE_DIR"] = _private_cache_dir(app.config["JINJA_CACHE_DIR"])
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["JINJA_CACHE_DIR"])
+# Dados fixos do formulário de chamado: globais do Jinja, sem repassar a cada render
+app.jinja_env.globals.update(dept_options=DEPT_KEYS, dept_map=DEPT_MAP)
+
+# -----------------------------------------------------
+# SQL das rotas
+# -----------------------------------------------------
+# Texto fixo por statement: cada conexão prepara uma vez e reaproveita (cached_statements)
+SQL_USER_BY_ID: Final[str] = "SELECT id, name, email, role, created_at FROM users WHERE id = ?"
+SQL_USER_LOGIN: Final[str] = "SELECT id, role, password_hash FROM users WHERE email = ?"
+SQL_USER_PASSWORD_HASH: Final[str] = "SELECT password_hash FROM users WHERE id = ?"
+SQL_INSERT_USER: Final[str] = (
+    "INSERT INTO users (name, email, password_hash, created_at) VALUES (?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))"
+)
+SQL_SET_USER_NAME: Final[str] = "UPDATE users SET name = ? WHERE id = ?"
+SQL_SET_PASSWORD_HASH: Final[str] = "UPDATE users SET password_hash = ? WHERE id = ?"
+
+SQL_ADMIN_KPIS: Final[str] = """
+    SELECT COUNT(CASE WHEN status='aberto' THEN 1 END),
+           COUNT(CASE WHEN status='em andamento' THEN 1 END),
+           COUNT(CASE WHEN status='fechado' THEN 1 END),
+           COUNT(*)
+    FROM tickets
+"""
+
+_SQL_TICKET_LIST: Final[str] = (
+    "SELECT id, title, status, department, subcategory, replace(substr(created_at, 1, 19), 'T', ' ') AS created_short FROM tickets"
+)
+SQL_LIST_VERSION: Final[str] = "SELECT n FROM list_version WHERE id = 1"
+
+# Keyset: "id < ?" + LIMIT percorre só a página pelo índice, em qualquer profundidade
+SQL_TICKETS_BY_USER: Final[str] = _SQL_TICKET_LIST + " WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?"
+SQL_TICKETS_BY_USER_AND_STATUS: Final[str] = (
+    _SQL_TICKET_LIST + " WHERE user_id = ? AND status = ? AND id < ? ORDER BY id DESC LIMIT ?"
+)
+
+_SQL_ADMIN_TICKET_LIST: Final[str] = """
+    SELECT t.id, t.title, t.status, replace(substr(t.created_at, 1, 19), 'T', ' ') AS created_short,
+           t.department, t.subcategory,
+           u.name as author_name, u.email as author_email
+    FROM tickets t JOIN users u ON u.id = t.user_id
+"""
+SQL_ADMIN_TICKETS: Final[str] = _SQL_ADMIN_TICKET_LIST + " WHERE t.id < ? ORDER BY t.id DESC LIMIT ?"
+SQL_ADMIN_TICKETS_BY_STATUS: Final[str] = (
+    _SQL_ADMIN_TICKET_LIST + " WHERE t.status = ? AND t.id < ? ORDER BY t.id DESC LIMIT ?"
+)
+
+SQL_INSERT_TICKET: Final[str] = """
+    INSERT INTO tickets (title, description, status, department, subcategory, user_id, created_at)
+    VALUES (?, ?, 'aberto', ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+"""
+
+# Chamado + comentários + autores (cada um uma vez só, não por comentário) numa ida ao SQLite
+_SQL_TICKET_VIEW: Final[str] = """
+    SELECT t.id, t.title, t.description, t.status, t.department, t.subcategory,
+           replace(substr(t.created_at, 1, 19), 'T', ' ') AS created_short,
+           (SELECT json_group_array(json_object(
+                       'id', c.id, 'user_id', c.user_id, 'body', c.body,
+                       'created_short', replace(substr(c.created_at, 1, 19), 'T', ' ')))
+            FROM comments c
+            WHERE c.ticket_id = t.id) AS comments_json,
+           (SELECT json_group_object(u.id, json_object('name', u.name, 'role', u.role))
+            FROM users u
+            WHERE u.id IN (SELECT user_id FROM comments WHERE ticket_id = t.id)) AS authors_json
+    FROM tickets t
+"""
+# Acesso: dono do chamado ou admin (último parâmetro = 1); um statement só para os dois papéis
+SQL_TICKET_VIEW: Final[str] = _SQL_TICKET_VIEW + " WHERE t.id = ? AND (t.user_id = ? OR ? = 1)"
+
+SQL_SET_STATUS: Final[str] = "UPDATE tickets SET status = ? WHERE id = ? AND (user_id = ? OR ? = 1)"
+
+_SQL_INSERT_COMMENT: Final[str] = """
+    INSERT INTO comments (ticket_id, user_id, body, created_at)
+    SELECT ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now')
+"""
+SQL_INSERT_COMMENT: Final[str] = _SQL_INSERT_COMMENT + (
+    " WHERE EXISTS (SELECT 1 FROM tickets WHERE id = ? AND (user_id = ? OR ? = 1))"
+)
+
 # -----------------------------------------------------
 # Rotas
 # -----------------------------------------------------
-@app.before_request
-def before_request():
-    init_db()
+# Landing anônima não tem nada dinâmico: renderizada no primeiro acesso e reaproveitada
+_PUBLIC_HOME_ANON: Optional[str] = None
 
 @app.get("/")
 def public_home():
     # Landing pública (quem somos/contato)
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, 'public_home.html')[0],
+    global _PUBLIC_HOME_ANON
+    if not session.get("user_id") and "_flashes" not in session:
+        if _PUBLIC_HOME_ANON is None:
+            _PUBLIC_HOME_ANON = render_template("public_home.html", user=None)
+        return _PUBLIC_HOME_ANON, 200, {"Content-Type": "text/html; charset=utf-8"}
+    return render_template(
+        "public_home.html",
         user=current_user()
     )
 
@@ -786,16 +1263,16 @@ def app_home():
     # KPIs só para admin
     kpis = None
     if user and user["role"] == "admin":
-        def count(q, a=()):
-            return get_db().execute(q, a).fetchone()[0]
+        # Uma varredura só para os quatro contadores
+        row = get_db().execute(SQL_ADMIN_KPIS).fetchone()
         kpis = {
-            "open":     count("SELECT COUNT(*) FROM tickets WHERE status='aberto'"),
-            "progress": count("SELECT COUNT(*) FROM tickets WHERE status='em andamento'"),
-            "closed":   count("SELECT COUNT(*) FROM tickets WHERE status='fechado'"),
-            "total":    count("SELECT COUNT(*) FROM tickets"),
+            "open":     row[0],
+            "progress": row[1],
+            "closed":   row[2],
+            "total":    row[3],
         }
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, 'index.html')[0],
+    return render_template(
+        "index.html",
         user=user,
         kpis=(kpis or {})
     )
@@ -806,57 +1283,59 @@ def login():
         email = request.form.get("email", "").strip().lower()
         password = request.form.get("password", "")
         db = get_db()
-        cur = db.execute("SELECT * FROM users WHERE email = ?", (email,))
+        cur = db.execute(SQL_USER_LOGIN, (email,))
         user = cur.fetchone()
-        if user and check_password_hash(user["password_hash"], password):
+        ok = verify_password(user["password_hash"] if user else dummy_hash(), password) and user is not None
+        if ok:
+            if password_needs_rehash(user["password_hash"]):
+                writer.execute(SQL_SET_PASSWORD_HASH, (hash_password(password), user["id"]))
             session.clear()
             session["user_id"] = user["id"]
+            session["user_role"] = user["role"]
             flash("Login realizado com sucesso.", "success")
             nxt = request.args.get("next")
             return redirect(nxt or url_for("app_home"))
         flash("Credenciais inválidas.", "danger")
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, "login.html")[0],
+    return render_template(
+        "login.html",
         user=current_user()
     )
 
 @app.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
-        name = request.form.get("name", "").strip()
-        email = request.form.get("email", "").strip().lower()
-        password = request.form.get("password", "")
-        if not name or not email or not password:
+        vals = required(request.form, "name", "email")
+        password = request.form.get("password", "")  # senha sem strip
+        if vals is None or not password:
             flash("Preencha todos os campos.", "warning")
         else:
-            db = get_db()
+            name, email = vals[0], vals[1].lower()
             try:
-                db.execute(
-                    "INSERT INTO users (name, email, password_hash, created_at) VALUES (?, ?, ?, ?)",
-                    (name, email, generate_password_hash(password), datetime.utcnow().isoformat()),
-                )
-                db.commit()
+                writer.execute(SQL_INSERT_USER, (name, email, hash_password(password)))
                 flash("Conta criada. Faça login.", "success")
                 return redirect("/login")
             except sqlite3.IntegrityError:
                 flash("E-mail já cadastrado.", "danger")
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, "register.html")[0],
+    return render_template(
+        "register.html",
         user=current_user()
     )
 
+# Headers fixos montados uma vez; a Response é nova a cada chamada porque
+# o Flask grava o Set-Cookie da sessão nela (um objeto compartilhado acumularia cookies)
+_LOGOUT_HEADERS: Final[tuple] = (("Location", "/login"), ("Cache-Control", "no-store"))
+
 @app.get("/logout")
-@login_required
 def logout():
     session.clear()
     flash("Sessão encerrada.", "info")
-    return redirect("/login")
+    return app.response_class(status=302, headers=_LOGOUT_HEADERS)
 
 @app.get("/profile")
 @login_required
 def profile():
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, "profile.html")[0],
+    return render_template(
+        "profile.html",
         user=current_user()
     )
 
@@ -867,9 +1346,7 @@ def profile_update_name():
     if not name:
         flash("Nome inválido.", "warning")
         return redirect(url_for("profile"))
-    db = get_db()
-    db.execute("UPDATE users SET name = ? WHERE id = ?", (name, session["user_id"]))
-    db.commit()
+    writer.execute(SQL_SET_USER_NAME, (name, session["user_id"]))
     flash("Nome atualizado.", "success")
     return redirect(url_for("profile"))
 
@@ -883,120 +1360,86 @@ def profile_update_password():
         flash("Nova senha não confere.", "danger")
         return redirect(url_for("profile"))
     db = get_db()
-    user = db.execute("SELECT password_hash FROM users WHERE id = ?", (session["user_id"],)).fetchone()
-    if not user or not check_password_hash(user["password_hash"], current):
+    user = db.execute(SQL_USER_PASSWORD_HASH, (session["user_id"],)).fetchone()
+    ok = verify_password(user["password_hash"] if user else dummy_hash(), current) and user is not None
+    if not ok:
         flash("Senha atual incorreta.", "danger")
         return redirect(url_for("profile"))
-    db.execute("UPDATE users SET password_hash = ? WHERE id = ?", (generate_password_hash(new), session["user_id"]))
-    db.commit()
+    writer.execute(SQL_SET_PASSWORD_HASH, (hash_password(new), session["user_id"]))
     flash("Senha atualizada.", "success")
     return redirect(url_for("profile"))
 
 @app.get("/tickets")
 @login_required
 def tickets():
-    db = get_db()
+    etag = list_etag()
+    if etag and request.if_none_match.contains_weak(etag):
+        return list_not_modified(etag)
     status = (request.args.get('status') or '').strip()
-    if status in {"aberto", "em andamento", "fechado"}:
-        cur = db.execute(
-            "SELECT id, title, description, status, department, subcategory, created_at FROM tickets WHERE user_id = ? AND status = ? ORDER BY id DESC",
-            (session["user_id"], status),
-        )
+    # Uma linha a mais que a página só para saber se existe a próxima
+    before, n = page_args()
+    if status in VALID_STATUSES:
+        rows = iter_tickets(SQL_TICKETS_BY_USER_AND_STATUS, (session["user_id"], status, before, n + 1))
     else:
-        cur = db.execute(
-            "SELECT id, title, description, status, department, subcategory, created_at FROM tickets WHERE user_id = ? ORDER BY id DESC",
-            (session["user_id"],),
-        )
-    rows = cur.fetchall()
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, "tickets.html")[0],
+        rows = iter_tickets(SQL_TICKETS_BY_USER, (session["user_id"], before, n + 1))
+    return list_response(
+        etag, "tickets.html",
         user=current_user(),
-        tickets=rows
+        tickets=rows, page_size=n
     )
 
 @app.route("/tickets/novo", methods=["GET", "POST"])
 @login_required
 def ticket_new():
     if request.method == "POST":
-        title = request.form.get("title", "").strip()
-        desc = request.form.get("description", "").strip()
-        dept = request.form.get("department", "").strip()
-        subc = request.form.get("subcategory", "").strip()
-        if not title or not desc or not dept or not subc:
+        vals = required(request.form, "title", "description", "department", "subcategory")
+        if vals is None:
             flash("Preencha título, setor e subcategoria.", "warning")
         else:
-            db = get_db()
-            db.execute(
-                """
-                INSERT INTO tickets (title, description, status, department, subcategory, user_id, created_at)
-                VALUES (?, ?, 'aberto', ?, ?, ?, ?)
-                """,
-                (title, desc, dept, subc, session["user_id"], datetime.utcnow().isoformat()),
-            )
-            db.commit()
+            title, desc, dept, subc = vals
+            writer.execute(SQL_INSERT_TICKET, (title, desc, dept, subc, session["user_id"]))
             flash("Chamado criado com sucesso.", "success")
             return redirect(url_for("tickets"))
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, "ticket_new.html")[0],
-        user=current_user(),
-        dept_options=list(DEPT_MAP.keys()),
-        dept_map=DEPT_MAP
-    )
+    return render_template("ticket_new.html", user=current_user())
 
-@app.get("/tickets/<int:ticket_id>")
+# ids acima do INTEGER do SQLite não casam com a rota: 404 em vez de OverflowError no bind
+@app.get(f"/tickets/<int(max={_MAX_ROWID}):ticket_id>")
 @login_required
 def ticket_view(ticket_id: int):
-    db = get_db()
-    user = current_user()
-    if user and user["role"] == "admin":
-        cur = db.execute(
-            "SELECT id, title, description, status, department, subcategory, created_at FROM tickets WHERE id = ?",
-            (ticket_id,),
-        )
-    else:
-        cur = db.execute(
-            "SELECT id, title, description, status, department, subcategory, created_at FROM tickets WHERE id = ? AND user_id = ?",
-            (ticket_id, session["user_id"],),
-        )
-    t = cur.fetchone()
+    is_admin = 1 if session_role() == "admin" else 0
+    t = get_db().execute(SQL_TICKET_VIEW, (ticket_id, session["user_id"], is_admin)).fetchone()
     if not t:
         flash("Chamado não encontrado.", "warning")
         return redirect(url_for("tickets"))
+    t = decorate_ticket(dict(t))
+    comments = sorted(json.loads(t.pop("comments_json")), key=lambda c: c["id"])
+    # Chaves de objeto JSON são texto
+    authors = {int(k): v for k, v in json.loads(t.pop("authors_json")).items()}
 
-    comments = db.execute(
-        """
-        SELECT c.id, c.body, c.created_at, u.name, u.role
-        FROM comments c JOIN users u ON u.id = c.user_id
-        WHERE c.ticket_id = ? ORDER BY c.id ASC
-        """,
-        (ticket_id,)
-    ).fetchall()
-
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, "ticket_view.html")[0],
+    return render_template(
+        "ticket_view.html",
         user=current_user(),
-        t=t, comments=comments
+        t=t, comments=comments, authors=authors
     )
 
-@app.post("/tickets/<int:ticket_id>/status")
+@app.post(f"/tickets/<int(max={_MAX_ROWID}):ticket_id>/status")
 @login_required
 def ticket_update_status(ticket_id: int):
     new_status = request.form.get("status", "aberto").strip()
-    if new_status not in {"aberto", "em andamento", "fechado"}:
+    if new_status not in VALID_STATUSES:
         flash("Status inválido.", "danger")
         return redirect(url_for("ticket_view", ticket_id=ticket_id))
 
-    db = get_db()
-    user = current_user()
-    if user and user["role"] == "admin":
-        db.execute("UPDATE tickets SET status = ? WHERE id = ?", (new_status, ticket_id))
-    else:
-        db.execute("UPDATE tickets SET status = ? WHERE id = ? AND user_id = ?", (new_status, ticket_id, session["user_id"]))
-    db.commit()
+    # rowcount diz se o chamado existe (e é do usuário) sem SELECT prévio
+    is_admin = 1 if session_role() == "admin" else 0
+    updated = writer.execute(SQL_SET_STATUS, (new_status, ticket_id, session["user_id"], is_admin))
+    if not updated:
+        flash("Chamado não encontrado.", "warning")
+        return redirect(url_for("tickets"))
     flash("Status atualizado.", "success")
     return redirect(url_for("ticket_view", ticket_id=ticket_id))
 
-@app.post("/tickets/<int:ticket_id>/comments")
+@app.post(f"/tickets/<int(max={_MAX_ROWID}):ticket_id>/comments")
 @login_required
 def ticket_add_comment(ticket_id: int):
     body = (request.form.get("body") or "").strip()
@@ -1004,54 +1447,44 @@ def ticket_add_comment(ticket_id: int):
         flash("Comentário vazio.", "warning")
         return redirect(url_for("ticket_view", ticket_id=ticket_id))
 
-    db = get_db()
-    user = current_user()
-    allowed = False
-    if user and user["role"] == "admin":
-        allowed = True
-    else:
-        cur = db.execute("SELECT 1 FROM tickets WHERE id = ? AND user_id = ?", (ticket_id, session["user_id"]))
-        allowed = cur.fetchone() is not None
+    # Checagem de acesso dentro do próprio INSERT: nada inserido = sem permissão
+    uid = session["user_id"]
+    is_admin = 1 if session_role() == "admin" else 0
+    inserted = writer.execute(SQL_INSERT_COMMENT, (ticket_id, uid, body, ticket_id, uid, is_admin))
 
-    if not allowed:
+    if not inserted:
         flash("Você não pode comentar neste chamado.", "danger")
         return redirect(url_for("tickets"))
-
-    db.execute(
-        "INSERT INTO comments (ticket_id, user_id, body, created_at) VALUES (?, ?, ?, ?)",
-        (ticket_id, session["user_id"], body, datetime.utcnow().isoformat()),
-    )
-    db.commit()
     return redirect(url_for("ticket_view", ticket_id=ticket_id))
 
 @app.get("/admin/tickets")
 @login_required
 @admin_required
 def admin_tickets():
-    db = get_db()
+    etag = list_etag()
+    if etag and request.if_none_match.contains_weak(etag):
+        return list_not_modified(etag)
     status = (request.args.get('status') or '').strip()
-    base_sql = """
-        SELECT t.id, t.title, t.status, t.created_at, t.department, t.subcategory,
-               u.name as author_name, u.email as author_email
-        FROM tickets t JOIN users u ON u.id = t.user_id
-    """
-    args = []
-    if status in {"aberto", "em andamento", "fechado"}:
-        base_sql += " WHERE t.status = ?"
-        args.append(status)
-    base_sql += " ORDER BY t.id DESC"
-    rows = db.execute(base_sql, tuple(args)).fetchall()
-    return render_template_string(
-        app.jinja_loader.get_source(app.jinja_env, "admin_tickets.html")[0],
+    before, n = page_args()
+    if status in VALID_STATUSES:
+        rows = iter_tickets(SQL_ADMIN_TICKETS_BY_STATUS, (status, before, n + 1))
+    else:
+        rows = iter_tickets(SQL_ADMIN_TICKETS, (before, n + 1))
+    return list_response(
+        etag, "admin_tickets.html",
         user=current_user(),
-        tickets=rows
+        tickets=rows, page_size=n
     )
 
 # -----------------------------------------------------
 # Execução
 # -----------------------------------------------------
+_initialize_database()
+
+# Compila todos os templates já no boot: o primeiro request não paga o parse
+for _name in app.jinja_loader.list_templates():
+    app.jinja_env.get_template(_name)
+
+# Produção: `gunicorn app:app` (workers/threads em gunicorn.conf.py)
 if __name__ == "__main__":
-    Path(app.config["DATABASE"]).touch(exist_ok=True)
-    with app.app_context():
-        init_db()
     app.run(host="0.0.0.0", port=5000, debug=True)
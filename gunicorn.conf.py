@@ -0,0 +1,21 @@
+# Configuração do gunicorn (lida automaticamente por `gunicorn app:app`)
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+
+# Um processo por núcleo contorna o GIL; threads cobrem a espera de I/O do SQLite
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+
+def post_fork(server, worker):
+    # Cada worker começa com o pool vazio e abre as próprias conexões SQLite
+    import app
+    app.close_db_pool()
+
+
+def worker_exit(server, worker):
+    import app
+    app.close_db_connections()
@@ -0,0 +1,36 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from contextlib import closing
+from pathlib import Path
+
+_TMP = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE", os.path.join(_TMP.name, "helpdesk.db"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app as helpdesk  # noqa: E402
+
+
+class TestingHasherTest(unittest.TestCase):
+    def stored_hash(self, email: str) -> str:
+        with closing(sqlite3.connect(helpdesk.app.config["DATABASE"])) as db:
+            return db.execute("SELECT password_hash FROM users WHERE email = ?", (email,)).fetchone()[0]
+
+    def test_login_with_testing_keeps_production_hash(self):
+        before = self.stored_hash("admin@local")
+        self.assertTrue(before.startswith("$argon2id$v=19$m=47104,"))
+        helpdesk.app.config["TESTING"] = True
+        try:
+            resp = helpdesk.app.test_client().post(
+                "/login", data={"email": "admin@local", "password": "admin123"}
+            )
+        finally:
+            helpdesk.app.config["TESTING"] = False
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(self.stored_hash("admin@local"), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from contextlib import closing
+from pathlib import Path
+
+_TMP = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE", os.path.join(_TMP.name, "helpdesk.db"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app as helpdesk  # noqa: E402
+
+HUGE_ID = 99999999999999999999999  # além do INTEGER de 64 bits do SQLite
+
+
+class WriterFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.db_path = helpdesk.app.config["DATABASE"]
+
+    def assert_write_lock_free(self):
+        with closing(sqlite3.connect(self.db_path, timeout=0)) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.rollback()
+
+    def test_statement_error_fails_only_its_future(self):
+        with self.assertRaises(OverflowError):
+            helpdesk.writer.execute(helpdesk.SQL_SET_STATUS, ("fechado", HUGE_ID, 1, 1))
+        self.assert_write_lock_free()
+        updated = helpdesk.writer.execute(helpdesk.SQL_SET_USER_NAME, ("Administrador", 1))
+        self.assertEqual(updated, 1)
+
+    def test_huge_ticket_id_is_not_found(self):
+        client = helpdesk.app.test_client()
+        client.post("/login", data={"email": "admin@local", "password": "admin123"})
+
+        self.assertEqual(client.get(f"/tickets/{HUGE_ID}").status_code, 404)
+        resp = client.post(f"/tickets/{HUGE_ID}/status", data={"status": "fechado"})
+        self.assertEqual(resp.status_code, 404)
+        resp = client.post(f"/tickets/{HUGE_ID}/comments", data={"body": "oi"})
+        self.assertEqual(resp.status_code, 404)
+
+        self.assert_write_lock_free()
+        updated = helpdesk.writer.execute(helpdesk.SQL_SET_USER_NAME, ("Administrador", 1))
+        self.assertEqual(updated, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()